@@ -1,23 +0,0 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from agent import handle_query
-
-app = FastAPI()
-
-# Allow frontend to connect
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Use exact URL in production
-    allow_methods=["*"],
-    allow_headers=["*"]
-)
-
-# Request schema
-class QueryRequest(BaseModel):
-    query: str
-
-@app.post("/query")
-async def query_endpoint(request: QueryRequest):
-    response = await handle_query(request.query)
-    return response
@@ -1,149 +1,103 @@
-import openai
+import asyncio
 import os
+import threading
 import json
 import pandas as pd
 from datetime import datetime
 from dotenv import load_dotenv
-from typing import Dict, Any
-from data_utils import load_sensor_data
+from openai import AsyncOpenAI
+from typing import Dict, Any, Tuple
+from data_utils import FIELD_MAPPINGS, load_cached_sensor_data, data_signature, normalize_columns, read_ndjson
+from functools import lru_cache
 import re
-import sys
-from io import StringIO
 
 # Load .env variables
 load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
 DATA_DIR = os.getenv("DATA_DIR", "./sensor-data")
+CACHE_DIR = os.getenv("CACHE_DIR", "./.cache")
 MODEL = "gpt-3.5-turbo"
 print(f"Using OpenAI model: {MODEL}")
 
-# Field mappings to normalize inconsistent field names (updated with exact keys)
-FIELD_MAPPINGS = {
-    'temperature': ['temperature', 'temp', 'Temperature (C)', 'Temperature (°C)', 'room_temperature'],
-    'humidity': ['humidity', 'Humidity %', 'humid', 'Relative Humidity (%)'],
-    'co2': ['co2', 'CO2 (PPM)', 'co2_level', 'carbon_dioxide', 'CO2 (ppm)'],
-    'timestamp': ['timestamp', 'time', 'datetime']
-}
+# Created on first use, so a missing API key is reported per query instead of
+# stopping the app from starting
+@lru_cache(maxsize=1)
+def get_client() -> AsyncOpenAI:
+    return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-# Normalize a JSON line based on known mappings
-def normalize_fields(raw: Dict[str, Any]) -> Dict[str, Any]:
-    normalized = {}
-    for standard, variants in FIELD_MAPPINGS.items():
-        for v in variants:
-            if v in raw:
-                normalized[standard] = raw[v]
-                break
-    # DEBUG: Print normalized fields for verification
-    print("Normalized fields:", normalized)
-    return normalized
+# Markdown code fences GPT sometimes wraps its answer in
+CODE_FENCE = re.compile(r"^```(?:python)?\s*|```\s*$", re.MULTILINE)
+
+# Proper day order for sorting day-of-week results
+DAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+DAY_TO_NUM = {day: i for i, day in enumerate(DAY_ORDER)}
 
 # Read all sensor files into one DataFrame with room name
 def load_all_data():
-    all_data = []
+    frames = []
     for filename in os.listdir(DATA_DIR):
         if filename.endswith(".txt") or filename.endswith(".json"):
             room = os.path.splitext(filename)[0]
-            with open(os.path.join(DATA_DIR, filename)) as f:
-                for line in f:
-                    try:
-                        raw = json.loads(line)
-                        data = normalize_fields(raw)
-                        data['room'] = room
-                        all_data.append(data)
-                    except Exception as e:
-                        print(f"Skipping line due to error: {e}")
-                        continue
-    df = pd.DataFrame(all_data)
-    # Parse timestamps
+            frame = read_ndjson(os.path.join(DATA_DIR, filename))
+            frame['room'] = room
+            frames.append(frame)
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    df = normalize_columns(df).reindex(columns=[*FIELD_MAPPINGS, 'room'])
+    # Parse timestamps; utc=True so mixed offsets and naive values (read as UTC) can't fail the load
     if 'timestamp' in df.columns:
-        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601', utc=True, errors='coerce')
     return df
 
+# Keep the most recently loaded DataFrame, along with the sample rows shown to
+# GPT; the signature argument makes the cache miss (and reload) as soon as any
+# sensor file changes on disk
+@lru_cache(maxsize=1)
+def cached_sensor_data(data_dir: str, signature: tuple) -> Tuple[pd.DataFrame, str]:
+    df = load_cached_sensor_data(data_dir, CACHE_DIR, signature)
+    preview = df.head(5).to_json(orient='records', date_format='iso', double_precision=2)
+    return df, preview
+
+# lru_cache doesn't stop two threads from loading at once, so a reload after a
+# file change is serialized here
+SENSOR_DATA_LOCK = threading.Lock()
+
+def get_sensor_data() -> Tuple[pd.DataFrame, str]:
+    with SENSOR_DATA_LOCK:
+        return cached_sensor_data(DATA_DIR, data_signature(DATA_DIR))
+
+# Repeated queries often produce identical code, so reuse its code object
+@lru_cache(maxsize=128)
+def compile_generated_code(code: str):
+    return compile(code, '<gpt>', 'exec')
+
 def safe_execute_code(code: str, df: pd.DataFrame) -> Dict[str, Any]:
     """
     Safely execute generated code and capture the result.
-    Tries multiple ways to get the output.
+    The code is expected to assign its answer to 'output'; anything it
+    prints goes to the server log and is not part of the result.
     """
     # Clean up code block markers
-    code = re.sub(r"^```(?:python)?\s*", "", code, flags=re.MULTILINE)
-    code = re.sub(r"```\s*$", "", code, flags=re.MULTILINE)
-    code = code.strip()
+    code = CODE_FENCE.sub("", code).strip()
     
-    # Create execution environment
+    # Create execution environment; the code gets a copy so the cached data
+    # stays untouched
     local_env = {
-        'df': df,
+        'df': df.copy(),
         'pd': pd,
         'json': json,
         'datetime': datetime
     }
     
-    # Capture stdout to get any print statements
-    old_stdout = sys.stdout
-    captured_output = StringIO()
-    
     try:
-        sys.stdout = captured_output
-        
         # Execute the code
-        exec(code, {'__builtins__': __builtins__, 'pd': pd, 'json': json, 'datetime': datetime}, local_env)
+        exec(compile_generated_code(code), {'__builtins__': __builtins__, 'pd': pd, 'json': json, 'datetime': datetime}, local_env)
         
-        # Try to find the result in multiple ways
-        result = None
-        
-        # Method 1: Look for 'output' variable
+        # The prompt asks for the answer in 'output'; accept 'result' as well
         if 'output' in local_env:
             result = local_env['output']
-        
-        # Method 2: Look for 'result' variable
         elif 'result' in local_env:
             result = local_env['result']
-        
-        # Method 3: Look for the last expression that looks like a result
         else:
-            # Try to find variables that look like results
-            possible_results = []
-            for var_name, var_value in local_env.items():
-                if (isinstance(var_value, dict) and 
-                    ('summary' in var_value or 'table' in var_value)):
-                    possible_results.append(var_value)
-            
-            if possible_results:
-                result = possible_results[-1]  # Take the last one
-            else:
-                # Method 4: Try to execute the last line if it looks like a variable name
-                lines = code.strip().split('\n')
-                if lines:
-                    last_line = lines[-1].strip()
-                    if (last_line and 
-                        not last_line.startswith('#') and 
-                        '=' not in last_line and 
-                        last_line in local_env):
-                        result = local_env[last_line]
-        
-        # If we still don't have a result, try to construct one from available variables
-        if result is None:
-            summary_vars = [v for k, v in local_env.items() if 'summary' in k.lower() and isinstance(v, str)]
-            table_vars = [v for k, v in local_env.items() if 'table' in k.lower() or k.endswith('_df') or isinstance(v, (list, pd.DataFrame))]
-            
-            result = {}
-            
-            if summary_vars:
-                result['summary'] = summary_vars[0]
-            
-            if table_vars:
-                table_data = table_vars[0]
-                if isinstance(table_data, pd.DataFrame):
-                    result['table'] = table_data.to_dict(orient='records')
-                elif isinstance(table_data, list):
-                    result['table'] = table_data
-            
-            if not result:
-                # Last resort: use captured output
-                output_text = captured_output.getvalue()
-                if output_text.strip():
-                    result = {'summary': output_text.strip(), 'table': []}
-                else:
-                    result = {'summary': 'Code executed but no clear result was returned.', 'table': []}
+            result = {'summary': 'Code executed but no clear result was returned.', 'table': []}
         
         # Ensure result has the expected structure
         if not isinstance(result, dict):
@@ -162,19 +116,18 @@ def safe_execute_code(code: str, df: pd.DataFrame) -> Dict[str, Any]:
             "summary": f"An error occurred during execution: {str(e)}",
             "table": []
         }
-    finally:
-        sys.stdout = old_stdout
 
 # Generate Python code using OpenAI to answer a query
 async def handle_query(query: str):
-    df = load_sensor_data(DATA_DIR)
-
-    preview_df = df.head(5).copy()
-    # Convert timestamp column to string to avoid JSON serialization error
-    if 'timestamp' in preview_df.columns:
-        preview_df['timestamp'] = preview_df['timestamp'].astype(str)
-
-    preview = preview_df.to_dict(orient='records')
+    # Checking for changed files (and reloading) touches the disk, so keep it
+    # off the event loop
+    try:
+        df, preview = await asyncio.to_thread(get_sensor_data)
+    except Exception as e:
+        return {
+            "summary": f"An error occurred while loading the sensor data: {str(e)}",
+            "table": []
+        }
 
     # Enhanced prompt template with better instructions
     prompt = f"""
@@ -185,7 +138,7 @@ containing sensor data from different rooms. Each row contains:
 - temperature, humidity, co2: sensor values (floats)
 
 Sample data (first 5 rows):
-{json.dumps(preview, indent=2)}
+{preview}
 
 User query:
 \"\"\"{query}\"\"\"
@@ -221,7 +174,7 @@ Only return the Python code. Do not include explanations or markdown.
 
     try:
         # Ask GPT for code
-        response = openai.ChatCompletion.create(
+        response = await get_client().chat.completions.create(
             model=MODEL,
             messages=[
                 {"role": "system", "content": "You are a Python data analyst. Always end your code by assigning the result to 'output' and then just write 'output' on the last line."},
@@ -229,16 +182,17 @@ Only return the Python code. Do not include explanations or markdown.
             ],
             temperature=0.3
         )
-        code = response['choices'][0]['message']['content']
+        code = response.choices[0].message.content
         print("Generated code:\n", code)
 
-        # Execute the code safely
-        result = safe_execute_code(code, df)
+        # Execute the code safely in a worker thread so the analysis doesn't
+        # block the event loop
+        result = await asyncio.to_thread(safe_execute_code, code, df)
         
         # Post-process the result to handle day ordering if needed
         if 'table' in result and isinstance(result['table'], list) and result['table']:
             # Check if this looks like day-of-week data that needs reordering
-            if any('day' in str(key).lower() for row in result['table'] for key in row.keys()):
+            if isinstance(result['table'][0], dict) and any('day' in str(key).lower() for key in result['table'][0]):
                 result = fix_day_ordering(result)
         
         return result
@@ -256,25 +210,17 @@ def fix_day_ordering(result: Dict[str, Any]) -> Dict[str, Any]:
     if 'table' not in result or not result['table']:
         return result
     
-    # Define proper day order
-    day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    
-    # Check if we have day names in the data
+    # Check if we have day names in the data; rows share the same keys, so
+    # the first row is enough to find the column
     table = result['table']
-    day_column = None
-    
-    for row in table:
-        for key, value in row.items():
-            if isinstance(value, str) and value in day_order:
-                day_column = key
-                break
-        if day_column:
-            break
+    day_column = next(
+        (key for key, value in table[0].items() if isinstance(value, str) and value in DAY_TO_NUM),
+        None
+    )
     
     if day_column:
         # Sort by proper day order
-        day_to_num = {day: i for i, day in enumerate(day_order)}
-        table.sort(key=lambda x: day_to_num.get(x[day_column], 999))
+        table.sort(key=lambda x: DAY_TO_NUM.get(x.get(day_column), 999))
         result['table'] = table
     
     return result
\ No newline at end of file
@@ -1,41 +1,163 @@
+import hashlib
 import json
+import multiprocessing
 import os
+import tempfile
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+# Bump when the shape or dtypes of the loaded DataFrame change so stale
+# Parquet caches are not picked up
+CACHE_VERSION = 11
+
+# Below this much NDJSON, starting worker processes costs more than parsing
+# the files in-process
+PARALLEL_LOAD_BYTES = 32 * 1024 * 1024
+
+# The loader runs again from a server with live threads whenever the files
+# change, so workers must not be forked from it
+POOL_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# orjson parses NDJSON lines several times faster than the stdlib decoder
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# Field mappings to normalize inconsistent field names
 FIELD_MAPPINGS = {
-    'temperature': ['temperature', 'temp', 'Temperature (C)', 'room_temperature'],
-    'humidity': ['humidity', 'Humidity %', 'humid'],
-    'co2': ['co2', 'CO2 (PPM)', 'co2_level', 'carbon_dioxide'],
+    'temperature': ['temperature', 'temp', 'Temp', 'Temperature (C)', 'Temperature (°C)', 'room_temperature'],
+    'humidity': ['humidity', 'Humidity %', 'humid', 'rh', 'RH', 'Relative Humidity (%)'],
+    'co2': ['co2', 'CO2', 'CO2 (PPM)', 'co2_level', 'carbon_dioxide', 'CO2 (ppm)'],
     'timestamp': ['timestamp', 'time', 'datetime']
 }
 
-def normalize_fields(raw):
-    normalized = {}
+# Normalize the column names of a whole DataFrame in one pass. When several
+# variants of the same field are present (e.g. files using different keys),
+# the first non-null value in FIELD_MAPPINGS order wins.
+def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    normalized = pd.DataFrame(index=df.index)
     for standard, variants in FIELD_MAPPINGS.items():
-        for v in variants:
-            if v in raw:
-                normalized[standard] = raw[v]
-                break
-    return normalized
+        present = [v for v in variants if v in df.columns]
+        if len(present) == 1:
+            normalized[standard] = df[present[0]]
+        elif present:
+            normalized[standard] = df[present].bfill(axis=1).iloc[:, 0]
+    fields = list(normalized.columns)
+    if 'room' in df.columns:
+        normalized['room'] = df['room']
+    # Records without any known field would carry nothing but the room
+    if not fields:
+        return normalized.iloc[0:0]
+    return normalized.dropna(how='all', subset=fields)
 
-def load_sensor_data(data_dir: str = "./sensor-data") -> pd.DataFrame:
-    all_data = []
-    path = Path(data_dir)
-
-    for file in path.glob("*.ndjson"):
-        room_name = file.stem.replace("sensor_data_", "")  # e.g. Room 1
-        with open(file, 'r') as f:
+# Read one NDJSON file into a DataFrame. pandas parses the whole file in C;
+# if any line is malformed we fall back to a line loop that keeps only the
+# lines holding a JSON object.
+def read_ndjson(file) -> pd.DataFrame:
+    try:
+        return pd.read_json(file, lines=True, dtype=False, convert_dates=False)
+    except ValueError:
+        rows = []
+        with open(file, 'rb') as f:
             for line in f:
                 try:
-                    raw = json.loads(line)
-                    normalized = normalize_fields(raw)
-                    normalized['room'] = room_name
-                    all_data.append(normalized)
+                    raw = json_loads(line)
                 except Exception:
                     continue
+                if isinstance(raw, dict):
+                    rows.append(raw)
+        return pd.DataFrame(rows)
+
+# Load a single room file; module level so worker processes can pickle it
+def load_room_file(file: str, room_name: str) -> pd.DataFrame:
+    frame = read_ndjson(file)
+    frame['room'] = room_name
+    return normalize_columns(frame)
+
+# Names and modification times of the sensor files; changes whenever a file
+# is added, removed or rewritten, so it can key a cache of the loaded data.
+# A missing directory has the empty signature, matching an empty load.
+def data_signature(data_dir: str = "./sensor-data") -> tuple:
+    try:
+        with os.scandir(data_dir) as it:
+            return tuple(sorted(
+                (entry.name, entry.stat().st_mtime_ns)
+                for entry in it if entry.name.endswith(".ndjson")
+            ))
+    except FileNotFoundError:
+        return ()
 
-    df = pd.DataFrame(all_data)
+def load_sensor_data(data_dir: str = "./sensor-data") -> pd.DataFrame:
+    try:
+        with os.scandir(data_dir) as it:
+            entries = [entry for entry in it if entry.name.endswith(".ndjson") and entry.is_file()]
+    except FileNotFoundError:
+        entries = []
+    files = [entry.path for entry in entries]
+    rooms = [entry.name[:-len(".ndjson")].removeprefix("sensor_data_") for entry in entries]  # e.g. Room 1
+
+    # Parsing is CPU-bound, so spread large loads over worker processes
+    if len(files) > 1 and sum(entry.stat().st_size for entry in entries) >= PARALLEL_LOAD_BYTES:
+        with ProcessPoolExecutor(max_workers=min(len(files), os.cpu_count() or 1), mp_context=POOL_CONTEXT) as ex:
+            frames = list(ex.map(load_room_file, files, rooms))
+    else:
+        frames = [load_room_file(file, room) for file, room in zip(files, rooms)]
+
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    # Same columns in the same order however the files were named or listed
+    df = df.reindex(columns=[*FIELD_MAPPINGS, 'room'])
+    # utc=True so mixed offsets and naive values (read as UTC) can't fail the load
     if 'timestamp' in df.columns:
-        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601', utc=True, errors='coerce')
+    # Sensor readings are kept as float64 so aggregates stay plain, JSON
+    # serializable floats; non-finite readings become NaN.
+    for col in ('temperature', 'humidity', 'co2'):
+        if col in df.columns:
+            values = pd.to_numeric(df[col], errors='coerce').astype('float64')
+            df[col] = values.where(np.isfinite(values))
+    return df
+
+# Load the sensor data through a Parquet cache keyed on the data signature.
+# Falls back to a plain load if the cache can't be read or written (e.g.
+# pyarrow missing or a read-only disk).
+def load_cached_sensor_data(data_dir: str = "./sensor-data", cache_dir: str = "./.cache", signature: tuple = None) -> pd.DataFrame:
+    if signature is None:
+        signature = data_signature(data_dir)
+    key = hashlib.sha1(repr((CACHE_VERSION, os.path.abspath(data_dir), signature)).encode()).hexdigest()
+    cache_file = Path(cache_dir) / f"sensor-{key}.parquet"
+
+    if cache_file.exists():
+        try:
+            return pd.read_parquet(cache_file)
+        except Exception:
+            pass
+
+    df = load_sensor_data(data_dir)
+    tmp_file = None
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file and rename it so readers never see a partial file
+        fd, tmp_file = tempfile.mkstemp(dir=cache_file.parent, prefix="sensor-", suffix=".tmp")
+        os.close(fd)
+        df.to_parquet(tmp_file)
+        os.replace(tmp_file, cache_file)
+        tmp_file = None
+        # Drop caches of older data; only our own files, the directory may be shared
+        for old_file in cache_file.parent.glob("sensor-*.parquet"):
+            if old_file != cache_file:
+                old_file.unlink(missing_ok=True)
+    except Exception:
+        pass
+    finally:
+        if tmp_file is not None:
+            try:
+                os.remove(tmp_file)
+            except OSError:
+                pass
     return df
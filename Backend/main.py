@@ -1,7 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from agent import handle_query
+from agent import get_sensor_data, handle_query
 
 app = FastAPI()
 
@@ -13,6 +13,15 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+# Load the sensor data once up front instead of on the first query. A failure
+# here must not stop the server; the next query retries and reports it.
+@app.on_event("startup")
+def load_data():
+    try:
+        get_sensor_data()
+    except Exception as e:
+        print(f"Could not preload sensor data: {e}")
+
 # Request schema
 class QueryRequest(BaseModel):
     query: str